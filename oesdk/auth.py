@@ -1,5 +1,6 @@
 import logging
 import requests
+import oesdk.scheduler
 from oesdk.constants import REQUESTS_TIMEOUT, OE_API_URL
 
 
@@ -11,8 +12,10 @@ class AuthApi:
         self.baseUrl = base_url
 
     def getJWT(self):
-        token_resp = requests.post(
+        token_resp = oesdk.scheduler.request(
+            "POST",
             "{}auth".format(self.baseUrl),
+            route="auth",
             json={"username": self.username, "password": self.password},
             headers={
                 "Content-Type": "application/json",
@@ -1,3 +1,22 @@
 REQUESTS_TIMEOUT = 10
 OE_API_URL = "https://api.openenergi.net/v1/"
 READINGS_LIMIT = 200000
+# keep each resampled readings request well within REQUESTS_TIMEOUT
+RESAMPLED_READINGS_PER_REQUEST = 20000
+EXPORT_COMPRESSION = "snappy"
+EXPORT_MAX_ROWS_PER_FILE = 1000000
+# process-wide request scheduler (see oesdk.scheduler)
+SCHEDULER_MAX_CONCURRENCY = 12
+# slots that only real-time requests (e.g. signal dispatch) can use
+SCHEDULER_REALTIME_RESERVED = 2
+# further slots that bulk requests (e.g. historical readings) can not use,
+# so auth/entity/demand requests are not queued behind a backfill
+SCHEDULER_INTERACTIVE_RESERVED = 2
+SCHEDULER_ROUTE_LIMITS = {
+    "historical-raw": 6,
+    "historical-resampled": 6,
+}
+RATE_LIMIT_MAX_RETRIES = 5
+# signals are latency-critical: retry a rate-limited dispatch at most once
+SIGNALS_MAX_RETRIES = 1
+RATE_LIMIT_BACKOFF = 1
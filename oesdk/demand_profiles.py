@@ -5,6 +5,7 @@ import pandas as pd
 import requests
 from oesdk.time_helper import utc_to_settlement_period
 from oesdk.auth import AuthApi
+import oesdk.scheduler
 from oesdk.constants import REQUESTS_TIMEOUT, OE_API_URL
 
 
@@ -18,8 +19,10 @@ class DemandApi:
         """
         Make sure the ingestion user is allowed to submit active profiles
         """
-        em_mode_response = requests.patch(
+        em_mode_response = oesdk.scheduler.request(
+            "PATCH",
             "{}demand-profiles/{}/mode".format(self.baseUrl, entityCode),
+            route="demand-profiles",
             headers=self.auth.HttpHeaders,
             json={"key": "em-mode", "value": "cd-mode"},
         )
@@ -43,8 +46,10 @@ class DemandApi:
                 )
             )
 
-        profile_response = requests.patch(
+        profile_response = oesdk.scheduler.request(
+            "PATCH",
             "{}demand-profiles/{}/{}".format(self.baseUrl, entityCode, profileType),
+            route="demand-profiles",
             headers=self.auth.HttpHeaders,
             json=httpBody,
         )
@@ -123,10 +128,12 @@ class DemandApi:
                 "Can not recognise this profile type: '{}'".format(profileType)
             )
         # retrieve the profile
-        res = requests.get(
+        res = oesdk.scheduler.request(
+            "GET",
             "{}demand-profiles/{}/{}?start={}".format(
                 self.baseUrl, load_code, profileType, target_date
             ),
+            route="demand-profiles",
             headers=self.auth.HttpHeaders,
             timeout=REQUESTS_TIMEOUT,
         )
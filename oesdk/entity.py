@@ -1,5 +1,5 @@
-import requests
 import oesdk.auth
+import oesdk.scheduler
 from oesdk.constants import REQUESTS_TIMEOUT, OE_API_URL
 
 
@@ -10,8 +10,10 @@ class EntityApi:
         self.baseUrl = base_url
 
     def entityDetailsAsDict(self, entityCode):
-        entity_response = requests.get(
+        entity_response = oesdk.scheduler.request(
+            "GET",
             "{}entities/{}?expand_tags=true".format(self.baseUrl, entityCode),
+            route="entities",
             headers=self.auth.HttpHeaders,
             timeout=REQUESTS_TIMEOUT,
         )
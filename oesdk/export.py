@@ -0,0 +1,237 @@
+import argparse
+import logging
+import os
+import shutil
+import pandas as pd
+import oesdk.time_helper
+from oesdk.constants import (
+    EXPORT_COMPRESSION,
+    EXPORT_MAX_ROWS_PER_FILE,
+    OE_API_URL,
+)
+from oesdk.historical_timeseries import HistoricalApi
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "Exporting to Parquet requires pyarrow: "
+            "install it with `pip install oesdk[parquet]`"
+        )
+
+
+def _readings_schema():
+    return pa.schema(
+        [
+            ("Time", pa.timestamp("ns", tz="UTC")),
+            ("Value", pa.float64()),
+            ("Type", pa.string()),
+        ]
+    )
+
+
+def partition_path(root_path, entity_code, variable, date_str):
+    """
+    Hive-style partition folder: <root>/entity=<code>/variable=<var>/date=<yyyy-MM-dd>
+    """
+    return os.path.join(
+        root_path,
+        "entity={}".format(entity_code),
+        "variable={}".format(variable),
+        "date={}".format(date_str),
+    )
+
+
+def _recover_partition(target_path, old_path):
+    """
+    Finish a swap interrupted by a crash: put the previous partition
+    back if it was moved aside but not replaced, or delete it otherwise.
+    """
+    if not os.path.exists(old_path):
+        return
+    if os.path.exists(target_path):
+        shutil.rmtree(old_path)
+    else:
+        os.replace(old_path, target_path)
+
+
+def _swap_partition(new_path, target_path, old_path):
+    """
+    Replace the partition folder with new_path (or remove it if new_path is None).
+    The previous partition is only deleted once the new one is in place.
+    """
+    if os.path.exists(target_path):
+        os.replace(target_path, old_path)
+    if new_path is not None:
+        os.replace(new_path, target_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+
+class ExportApi:
+    def __init__(self, username, password, base_url=OE_API_URL):
+        _require_pyarrow()
+        self.historical = HistoricalApi(username, password, base_url)
+
+    def exportRawReadings(
+        self,
+        start,
+        end,
+        variables,
+        entity_codes,
+        root_path,
+        compression=EXPORT_COMPRESSION,
+        max_rows_per_file=EXPORT_MAX_ROWS_PER_FILE,
+    ):
+        """
+        Write raw readings as a Hive-partitioned Parquet dataset
+        (entity/variable/date) under root_path.
+
+        start/end are widened to whole UTC days, so that each partition
+        always holds its full day: re-running an export overwrites the
+        partitions it touches with the same data.
+        Each 1-hour slice is written as a Parquet row group in time order,
+        so only one day per partition is ever in flight.
+
+        Returns the list of partition folders that were written.
+        """
+        written = []
+        for entity_code in entity_codes:
+            for variable in variables:
+                for date_str, day_start, day_end in oesdk.time_helper.get_date_slices(
+                    start, end
+                ):
+                    target_path = partition_path(
+                        root_path, entity_code, variable, date_str
+                    )
+                    num_rows = self.__exportPartition(
+                        day_start,
+                        day_end,
+                        variable,
+                        entity_code,
+                        target_path,
+                        compression,
+                        max_rows_per_file,
+                    )
+                    if num_rows > 0:
+                        written.append(target_path)
+        return written
+
+    def __exportPartition(
+        self,
+        start,
+        end,
+        variable,
+        entity_code,
+        target_path,
+        compression,
+        max_rows_per_file,
+    ):
+        """
+        Files are written to a temporary folder (ignored by Parquet dataset
+        readers because of the leading underscore) which then replaces the
+        partition folder, so a partition is never left half-written.
+        """
+        parent_path, partition_name = os.path.split(target_path)
+        tmp_path = os.path.join(parent_path, "_tmp-{}".format(partition_name))
+        old_path = os.path.join(parent_path, "_old-{}".format(partition_name))
+        _recover_partition(target_path, old_path)
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        schema = _readings_schema()
+        writer = None
+        file_idx = 0
+        file_rows = 0
+        total_rows = 0
+        try:
+            for df in self.historical.iterRawReadings(
+                start, end, variable, entity_code, ordered=True
+            ):
+                table = pa.Table.from_pandas(
+                    pd.DataFrame(
+                        {
+                            "Time": df["Time"],
+                            "Value": df[variable],
+                            "Type": df["Type"],
+                        }
+                    ).sort_values("Time"),
+                    schema=schema,
+                    preserve_index=False,
+                )
+                if writer is not None and file_rows + len(table) > max_rows_per_file:
+                    writer.close()
+                    writer = None
+                    file_idx += 1
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        os.path.join(tmp_path, "part-{:05d}.parquet".format(file_idx)),
+                        schema,
+                        compression=compression,
+                    )
+                    file_rows = 0
+                writer.write_table(table)
+                file_rows += len(table)
+                total_rows += len(table)
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            shutil.rmtree(tmp_path)
+            raise
+        if writer is not None:
+            writer.close()
+
+        _swap_partition(tmp_path if total_rows > 0 else None, target_path, old_path)
+        if total_rows == 0:
+            shutil.rmtree(tmp_path)
+        logging.info(
+            "Exported {} raw readings for entity code {}, variable {}, start {}, end {} to '{}'".format(
+                total_rows, entity_code, variable, start, end, target_path
+            )
+        )
+        return total_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export raw readings to a Hive-partitioned Parquet dataset "
+        "(entity/variable/date). Credentials are read from the "
+        "BP_USERNAME and BP_PASSWORD environment variables."
+    )
+    parser.add_argument("root_path", help="folder of the Parquet dataset")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--entity", action="append", required=True, dest="entities")
+    parser.add_argument("--variable", action="append", required=True, dest="variables")
+    parser.add_argument("--compression", default=EXPORT_COMPRESSION)
+    parser.add_argument(
+        "--max-rows-per-file", type=int, default=EXPORT_MAX_ROWS_PER_FILE
+    )
+    parser.add_argument("--base-url", default=OE_API_URL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    export_api = ExportApi(
+        os.environ["BP_USERNAME"], os.environ["BP_PASSWORD"], args.base_url
+    )
+    export_api.exportRawReadings(
+        args.start,
+        args.end,
+        args.variables,
+        args.entities,
+        args.root_path,
+        compression=args.compression,
+        max_rows_per_file=args.max_rows_per_file,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,67 @@
 import concurrent.futures
 import logging
-import random
-import time
 import pandas as pd
 import requests
 import oesdk.auth
+import oesdk.scheduler
 import oesdk.time_helper
-from oesdk.constants import READINGS_LIMIT, REQUESTS_TIMEOUT, OE_API_URL
+from oesdk.constants import (
+    READINGS_LIMIT,
+    RESAMPLED_READINGS_PER_REQUEST,
+    REQUESTS_TIMEOUT,
+    OE_API_URL,
+)
 
 
 class HistoricalApi:
-    def __init__(self, username, password, base_url=OE_API_URL):
+    def __init__(
+        self,
+        username,
+        password,
+        base_url=OE_API_URL,
+        priority=oesdk.scheduler.PRIORITY_BULK,
+    ):
+        """
+        priority: the request scheduler priority of the readings requests
+        """
         self.auth = oesdk.auth.AuthApi(username, password, base_url)
         self.auth.refreshJWT()
         self.baseUrl = base_url
+        self.priority = priority
 
-    def getResampledReadings(self, start, end, variable, entity_code, resampling="30m"):
-        # validate dates...
-        start = oesdk.time_helper.to_iso_ts_zulu(start)
-        end = oesdk.time_helper.to_iso_ts_zulu(end)
-
+    def __submitResampledReadings(self, start, end, variable, entity_code, resampling):
+        """
+        Queue the request on the shared scheduler and return a Future of the response
+        """
         # build the URL for the API request
         api_http_route = "{}timeseries/historical/readings/points/{}/resamplings/{}?entity={}&start={}&finish={}&limit={}".format(
             self.baseUrl, variable, resampling, entity_code, start, end, READINGS_LIMIT
         )
-        logging.info(
+        logging.debug(
             "Retrieving resampled readings for entity code {}, variable {}, start time {}, end time {}".format(
                 entity_code, variable, start, end
             )
         )
-        res = requests.get(
-            api_http_route, headers=self.auth.HttpHeaders, timeout=REQUESTS_TIMEOUT
+        return oesdk.scheduler.submit(
+            "GET",
+            api_http_route,
+            route="historical-resampled",
+            priority=self.priority,
+            headers=self.auth.HttpHeaders,
+            timeout=REQUESTS_TIMEOUT,
         )
+
+    def __getResampledReadings(
+        self, start, end, variable, entity_code, resampling, res
+    ):
+        """
+        Returns the list of resampled readings (as JSON dictionaries)
+        between start and end, given the HTTP response for that range.
+        If the response hits READINGS_LIMIT it is truncated,
+        so the range is split in two (on the resampling window)
+        and both halves are requested concurrently.
+        Raises a ValueError if a truncated range can not be split further.
+        """
         if res.status_code != requests.codes.OK:
             logging.warning(
                 "The HTTP response about the retrieval of resampled readings is: '{}'".format(
@@ -44,8 +74,91 @@ class HistoricalApi:
                     requests.codes.OK  # pylint: disable=no-member
                 )
             )
-        # print(res.json())
-        df = pd.DataFrame.from_dict(res.json()["items"])
+        items = res.json()["items"]
+        if len(items) < READINGS_LIMIT:
+            return items
+
+        window = oesdk.time_helper.resampling_to_timedelta(resampling)
+        start_ts = oesdk.time_helper.to_pd_timestamp_utc(start)
+        end_ts = oesdk.time_helper.to_pd_timestamp_utc(end)
+        middle_ts = start_ts + (end_ts - start_ts) / 2
+        if window is not None:
+            middle_ts = middle_ts.floor(window)
+        if middle_ts <= start_ts:
+            raise ValueError(
+                "The resampled readings for entity code {}, variable {}, start {}, end {} hit the limit of {} and can not be split further".format(
+                    entity_code, variable, start, end, READINGS_LIMIT
+                )
+            )
+        middle = oesdk.time_helper.to_iso_ts_zulu(middle_ts)
+        logging.info(
+            "The resampled readings between {} and {} hit the limit of {}: splitting at {}".format(
+                start, end, READINGS_LIMIT, middle
+            )
+        )
+        halves = [[start, middle], [middle, end]]
+        jobs = [
+            self.__submitResampledReadings(
+                half[0], half[1], variable, entity_code, resampling
+            )
+            for half in halves
+        ]
+        items = []
+        for half, job in zip(halves, jobs):
+            items.extend(
+                self.__getResampledReadings(
+                    half[0], half[1], variable, entity_code, resampling, job.result()
+                )
+            )
+        return items
+
+    def getResampledReadings(self, start, end, variable, entity_code, resampling="30m"):
+        """
+        The range is requested in slices (concurrently) and joined in time order.
+        Raises a ValueError rather than returning incomplete data
+        if a single resampling window holds more than READINGS_LIMIT readings.
+        """
+        # validate dates...
+        start = oesdk.time_helper.to_iso_ts_zulu(start)
+        end = oesdk.time_helper.to_iso_ts_zulu(end)
+
+        # slice the range so that each request stays small,
+        # accounting for a comma separated list of entity codes
+        window = oesdk.time_helper.resampling_to_timedelta(resampling)
+        if window is None:
+            time_chops = [[start, end]]
+        else:
+            num_entities = len(str(entity_code).split(","))
+            points_per_slice = max(1, RESAMPLED_READINGS_PER_REQUEST // num_entities)
+            time_chops = oesdk.time_helper.get_resampled_slices(
+                start, end, window, points_per_slice
+            )
+        logging.info(
+            "Retrieving resampled readings for entity code {}, variable {}, start time {}, end time {} ({} slices)".format(
+                entity_code, variable, start, end, len(time_chops)
+            )
+        )
+        jobs = [
+            self.__submitResampledReadings(
+                time_slice[0], time_slice[1], variable, entity_code, resampling
+            )
+            for time_slice in time_chops
+        ]
+        items = []
+        # keep the slices in time order
+        for time_slice, job in zip(time_chops, jobs):
+            items.extend(
+                self.__getResampledReadings(
+                    time_slice[0],
+                    time_slice[1],
+                    variable,
+                    entity_code,
+                    resampling,
+                    job.result(),
+                )
+            )
+
+        df = pd.DataFrame.from_dict(items)
         df.rename(
             columns={
                 "time": "Time",
@@ -54,15 +167,19 @@ class HistoricalApi:
             },
             inplace=True,
         )
+        # a point on the boundary between two slices can be returned twice
+        if "Time" in df.columns:
+            df.drop_duplicates(
+                subset=[col for col in ["Time", "EntityCode"] if col in df.columns],
+                inplace=True,
+                ignore_index=True,
+            )
         df["Type"] = resampling  # resampling or "raw"
         return df
 
-    def __getRawReadings(
-        self, start, end, variable, entity_code, wait_before_request=0
-    ):
+    def __submitRawReadings(self, start, end, variable, entity_code):
         """
-        If no data is found, then it returns None.
-        Otherwise it returns a dataframe.
+        Queue the request on the shared scheduler and return a Future of the response
         """
         # validate dates...
         if start[-1] != "Z" or end[-1] != "Z":
@@ -71,17 +188,25 @@ class HistoricalApi:
             self.baseUrl, variable, entity_code, start, end
         )
         logging.debug(
-            "Retrieving raw readings for entity code {}, variable {}, start time {}, end time {} (wait_before_request? {} seconds)".format(
-                entity_code, variable, start, end, wait_before_request
+            "Retrieving raw readings for entity code {}, variable {}, start time {}, end time {}".format(
+                entity_code, variable, start, end
             )
         )
-        if wait_before_request > 0:
-            time.sleep(wait_before_request)
-
-        res = requests.get(
-            api_http_route, headers=self.auth.HttpHeaders, timeout=REQUESTS_TIMEOUT
+        return oesdk.scheduler.submit(
+            "GET",
+            api_http_route,
+            route="historical-raw",
+            priority=self.priority,
+            headers=self.auth.HttpHeaders,
+            timeout=REQUESTS_TIMEOUT,
         )
 
+    def __getRawReadings(self, start, end, variable, entity_code, res):
+        """
+        Parse the HTTP response with the raw readings.
+        If no data is found, then it returns None.
+        Otherwise it returns a dataframe.
+        """
         if res.status_code != requests.codes.OK:
             logging.warning(
                 "The HTTP response about the retrieval of raw readings is: '{}'".format(
@@ -129,30 +254,31 @@ class HistoricalApi:
         )
         return df
 
-    def getRawReadings(self, start, end, variable, entity_code):
+    def iterRawReadings(self, start, end, variable, entity_code, ordered=False):
+        """
+        Yields a dataframe for each 1-hour slice between start and end
+        as soon as its HTTP request completes (so not in time order),
+        or in time order if ordered is True.
+        Slices with no data are skipped.
+        """
         _1h_time_chops = oesdk.time_helper.get_datetime_slices(start, end)
-        df_list = []
-        # 6 threads seems the optimal number for 1-hour slices concurrent HTTP
-        # requests
-        num_threads = min(6, len(_1h_time_chops))
-        jobs = []
-        with concurrent.futures.ThreadPoolExecutor(num_threads) as tpe:
-            for _1h_slice in _1h_time_chops:
-                curr_random_sleep = random.random() * 0.5
-                jobs.append(
-                    tpe.submit(
-                        self.__getRawReadings,
-                        _1h_slice[0],
-                        _1h_slice[1],
-                        variable,
-                        entity_code,
-                        curr_random_sleep,
-                    )
-                )
-            for job in concurrent.futures.as_completed(jobs):
-                curr_df = job.result()
-                if curr_df is not None:
-                    df_list.append(curr_df)
+        # the shared scheduler limits how many of these requests run
+        # concurrently (see SCHEDULER_ROUTE_LIMITS)
+        jobs = {
+            self.__submitRawReadings(
+                _1h_slice[0], _1h_slice[1], variable, entity_code
+            ): _1h_slice
+            for _1h_slice in _1h_time_chops
+        }
+        for job in jobs if ordered else concurrent.futures.as_completed(jobs):
+            curr_df = self.__getRawReadings(
+                jobs[job][0], jobs[job][1], variable, entity_code, job.result()
+            )
+            if curr_df is not None:
+                yield curr_df
+
+    def getRawReadings(self, start, end, variable, entity_code):
+        df_list = list(self.iterRawReadings(start, end, variable, entity_code))
         # sort on the DatetimeIndex
         full_df = pd.concat(df_list, sort=True)
         full_df.sort_index(inplace=True)
@@ -0,0 +1,355 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+import time
+import requests
+from oesdk.constants import (
+    RATE_LIMIT_BACKOFF,
+    RATE_LIMIT_MAX_RETRIES,
+    SCHEDULER_INTERACTIVE_RESERVED,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_REALTIME_RESERVED,
+    SCHEDULER_ROUTE_LIMITS,
+)
+
+# lower values are dispatched first
+PRIORITY_REALTIME = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+
+class _Task:
+    def __init__(
+        self, method, url, route, priority, caller, deadline, max_retries, kwargs
+    ):
+        self.future = concurrent.futures.Future()
+        self.method = method
+        self.url = url
+        self.route = route
+        self.priority = priority
+        self.caller = caller
+        # time.monotonic() after which the request is not sent (or retried)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.kwargs = kwargs
+        self.attempts = 0
+
+
+class RequestScheduler:
+    """
+    Process-wide scheduler for the HTTP requests of all the Api classes.
+
+    - at most max_concurrency requests are in flight,
+      and at most route_limits[route] for a given route
+    - queued requests are dispatched by priority (PRIORITY_REALTIME first),
+      and realtime_reserved slots are only ever used by PRIORITY_REALTIME,
+      while interactive_reserved more slots are never used by PRIORITY_BULK
+    - within a priority and route, callers (by default the submitting thread)
+      are served round-robin, so one large backfill can not starve the others
+    - an HTTP 429 response pauses its route (honouring Retry-After)
+      and the request is queued again, up to max_retries times
+
+    Do not submit and wait on requests from within a scheduled request:
+    it would hold a slot while waiting for another one.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=SCHEDULER_MAX_CONCURRENCY,
+        route_limits=None,
+        realtime_reserved=SCHEDULER_REALTIME_RESERVED,
+        max_retries=RATE_LIMIT_MAX_RETRIES,
+        interactive_reserved=SCHEDULER_INTERACTIVE_RESERVED,
+    ):
+        if realtime_reserved + interactive_reserved >= max_concurrency:
+            raise ValueError(
+                "realtime_reserved ({}) plus interactive_reserved ({}) must be lower than max_concurrency ({})".format(
+                    realtime_reserved, interactive_reserved, max_concurrency
+                )
+            )
+        self.max_concurrency = max_concurrency
+        self.route_limits = dict(
+            SCHEDULER_ROUTE_LIMITS if route_limits is None else route_limits
+        )
+        self.realtime_reserved = realtime_reserved
+        self.interactive_reserved = interactive_reserved
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        # priority -> route -> caller -> deque of tasks:
+        # routes and callers are kept in round-robin order, and empty
+        # queues are removed, so dispatching a task does not depend on
+        # how many tasks are queued
+        self._queues = {}
+        self._running = 0
+        self._running_by_route = collections.Counter()
+        self._paused_until = {}
+        self._workers = []
+        self._shutdown = False
+
+    def submit(
+        self,
+        method,
+        url,
+        route,
+        priority=PRIORITY_INTERACTIVE,
+        caller=None,
+        total_timeout=None,
+        max_retries=None,
+        **kwargs
+    ):
+        """
+        Queue an HTTP request (the keyword arguments are passed to
+        requests.request) and return a Future of the response.
+
+        total_timeout: seconds after which the request is no longer sent
+        or retried (the Future then raises requests.exceptions.Timeout)
+        max_retries: override the scheduler max_retries on HTTP 429
+        """
+        if caller is None:
+            caller = threading.get_ident()
+        task = _Task(
+            method,
+            url,
+            route,
+            priority,
+            caller,
+            None if total_timeout is None else time.monotonic() + total_timeout,
+            self.max_retries if max_retries is None else max_retries,
+            kwargs,
+        )
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("The request scheduler has been shut down")
+            self._start_workers()
+            self._enqueue(task)
+            self._cond.notify()
+        return task.future
+
+    def request(
+        self,
+        method,
+        url,
+        route,
+        priority=PRIORITY_INTERACTIVE,
+        caller=None,
+        timeout=None,
+        max_retries=None,
+        **kwargs
+    ):
+        """
+        Send an HTTP request through the scheduler and return the response.
+
+        timeout covers the time spent queueing, sending and retrying,
+        as requests.exceptions.Timeout is raised once it elapses.
+        """
+        future = self.submit(
+            method,
+            url,
+            route,
+            priority,
+            caller,
+            total_timeout=timeout,
+            max_retries=max_retries,
+            timeout=timeout,
+            **kwargs
+        )
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise requests.exceptions.Timeout(
+                "No response from '{}' within {} seconds".format(url, timeout)
+            )
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(
+                target=self._work,
+                name="oesdk-scheduler-{}".format(len(self._workers)),
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _enqueue(self, task, first=False):
+        routes = self._queues.setdefault(task.priority, collections.OrderedDict())
+        callers = routes.setdefault(task.route, collections.OrderedDict())
+        if task.caller not in callers:
+            callers[task.caller] = collections.deque()
+        if first:
+            callers[task.caller].appendleft(task)
+            callers.move_to_end(task.caller, last=False)
+        else:
+            callers[task.caller].append(task)
+
+    def _route_available(self, route, now):
+        if self._paused_until.get(route, 0) > now:
+            return False
+        limit = self.route_limits.get(route)
+        return limit is None or self._running_by_route[route] < limit
+
+    def _priority_capacity(self, priority):
+        """
+        How many requests can be in flight for a request of this priority to be sent
+        """
+        if priority <= PRIORITY_REALTIME:
+            return self.max_concurrency
+        if priority <= PRIORITY_INTERACTIVE:
+            return self.max_concurrency - self.realtime_reserved
+        return self.max_concurrency - self.realtime_reserved - self.interactive_reserved
+
+    def _next_task(self, now):
+        for priority in sorted(self._queues):
+            if self._running >= self._priority_capacity(priority):
+                break
+            routes = self._queues[priority]
+            for route, callers in routes.items():
+                if not self._route_available(route, now):
+                    continue
+                caller, tasks = next(iter(callers.items()))
+                task = tasks.popleft()
+                if tasks:
+                    callers.move_to_end(caller)
+                else:
+                    del callers[caller]
+                if callers:
+                    routes.move_to_end(route)
+                else:
+                    del routes[route]
+                if not routes:
+                    del self._queues[priority]
+                return task
+        return None
+
+    def _wait_timeout(self, now):
+        """
+        Wake up when the earliest paused route resumes (if any)
+        """
+        for route in [r for r, until in self._paused_until.items() if until <= now]:
+            del self._paused_until[route]
+        pauses = [until - now for until in self._paused_until.values()]
+        return min(pauses) if pauses else None
+
+    def _pause_route(self, route, response, attempts):
+        """
+        Returns how many seconds the route is paused for
+        """
+        try:
+            backoff = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            backoff = RATE_LIMIT_BACKOFF * 2**attempts
+        logging.warning(
+            "Rate limited on route '{}': pausing it for {} seconds".format(
+                route, backoff
+            )
+        )
+        self._paused_until[route] = max(
+            self._paused_until.get(route, 0), time.monotonic() + backoff
+        )
+        return backoff
+
+    def _work(self):
+        while True:
+            with self._cond:
+                task = self._next_task(time.monotonic())
+                while task is None:
+                    # a shut down scheduler still completes its queued requests
+                    if self._shutdown and not self._queues:
+                        return
+                    self._cond.wait(self._wait_timeout(time.monotonic()))
+                    task = self._next_task(time.monotonic())
+                self._running += 1
+                self._running_by_route[task.route] += 1
+            try:
+                self._run(task)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._running_by_route[task.route] -= 1
+                    # one slot was freed: wake up one idle worker
+                    # (or all of them to exit, once shut down)
+                    if self._shutdown:
+                        self._cond.notify_all()
+                    else:
+                        self._cond.notify()
+
+    def _run(self, task):
+        if task.attempts == 0 and not task.future.set_running_or_notify_cancel():
+            return
+        kwargs = task.kwargs
+        if task.deadline is not None:
+            remaining = task.deadline - time.monotonic()
+            if remaining <= 0:
+                task.future.set_exception(
+                    requests.exceptions.Timeout(
+                        "The request to '{}' timed out before being sent".format(
+                            task.url
+                        )
+                    )
+                )
+                return
+            kwargs = dict(
+                kwargs, timeout=min(kwargs.get("timeout") or remaining, remaining)
+            )
+        try:
+            response = requests.request(task.method, task.url, **kwargs)
+        except BaseException as exc:  # pylint: disable=broad-except
+            task.future.set_exception(exc)
+            return
+        if (
+            response.status_code == requests.codes.too_many_requests
+            and task.attempts < task.max_retries
+        ):
+            with self._cond:
+                backoff = self._pause_route(task.route, response, task.attempts)
+                # only retry if the response can still arrive in time
+                if task.deadline is None or time.monotonic() + backoff < task.deadline:
+                    task.attempts += 1
+                    self._enqueue(task, first=True)
+                    return
+        task.future.set_result(response)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Returns the scheduler shared by all the Api classes in this process
+    """
+    global _scheduler  # pylint: disable=global-statement
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    Replace the shared scheduler (e.g. to change its limits),
+    the previous one completes its queued requests and then stops
+    """
+    global _scheduler  # pylint: disable=global-statement
+    with _scheduler_lock:
+        previous = _scheduler
+        _scheduler = scheduler
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def submit(method, url, route, priority=PRIORITY_INTERACTIVE, caller=None, **kwargs):
+    return get_scheduler().submit(method, url, route, priority, caller, **kwargs)
+
+
+def request(method, url, route, priority=PRIORITY_INTERACTIVE, caller=None, **kwargs):
+    return get_scheduler().request(method, url, route, priority, caller, **kwargs)
@@ -1,7 +1,8 @@
 import pandas as pd
 import requests
 import oesdk.auth
-from oesdk.constants import REQUESTS_TIMEOUT, OE_API_URL
+import oesdk.scheduler
+from oesdk.constants import REQUESTS_TIMEOUT, OE_API_URL, SIGNALS_MAX_RETRIES
 from oesdk.time_helper import to_iso_ts_zulu
 
 
@@ -13,8 +14,14 @@ class SignalApi:
 
     def dispatch_signal_to_entity(self, df, load_code, signal_type="variable-adjust"):
         message = build_signal_body(df, load_code, signal_type=signal_type)
-        response = requests.post(
+        # signals are latency-critical: they go ahead of any queued request,
+        # and the timeout covers queueing and retries
+        response = oesdk.scheduler.request(
+            "POST",
             self.baseUrl + "signals",
+            route="signals",
+            priority=oesdk.scheduler.PRIORITY_REALTIME,
+            max_retries=SIGNALS_MAX_RETRIES,
             headers=self.auth.HttpHeaders,
             json=message,
             timeout=REQUESTS_TIMEOUT,
@@ -2,6 +2,7 @@
 import datetime
 import logging
 import math
+import re
 import pandas as pd
 
 
@@ -84,6 +85,69 @@ def get_datetime_slices(start, end):
     return chops
 
 
+def get_date_slices(start, end):
+    """
+    Returns (date, start, end) *STRING* triples, one for each whole UTC day
+    overlapping start/end: the date has the format yyyy-MM-dd, while start
+    and end (the midnights around the date) have the Zulu format
+    (as in get_datetime_slices).
+
+    An end on midnight does not include the day starting at that midnight.
+    """
+    start = to_pd_timestamp_utc(start)
+    end = to_pd_timestamp_utc(end)
+    slices = []
+    if start >= end:
+        return slices
+    curr_start = start.normalize()
+    while curr_start < end:
+        curr_end = curr_start + pd.Timedelta(days=1)
+        slices.append(
+            (
+                curr_start.strftime("%Y-%m-%d"),
+                to_iso_ts_zulu(curr_start),
+                to_iso_ts_zulu(curr_end),
+            )
+        )
+        curr_start = curr_end
+    return slices
+
+
+def resampling_to_timedelta(resampling):
+    """
+    Returns the window of a resampling label (e.g. '30m', '1h',
+    '30m-compliance') as a pandas Timedelta, or None if it can not be parsed.
+    """
+    match = re.match(r"^(\d+)([smhd])", resampling)
+    if match is None:
+        return None
+    units = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+    return pd.Timedelta(**{units[match.group(2)]: int(match.group(1))})
+
+
+def get_resampled_slices(start, end, window, points_per_slice):
+    """
+    Returns *STRING* (ISO 8601, Zulu format) pairs between start and end,
+    each spanning at most points_per_slice resampling windows.
+
+    The boundaries between slices are aligned to the window,
+    so that a resampled point never straddles two slices.
+    """
+    start = to_pd_timestamp_utc(start)
+    end = to_pd_timestamp_utc(end)
+    step = window * points_per_slice
+    boundaries = [start]
+    next_boundary = start.floor(window) + step
+    while next_boundary < end:
+        boundaries.append(next_boundary)
+        next_boundary += step
+    boundaries.append(end)
+    return [
+        [to_iso_ts_zulu(boundaries[idx]), to_iso_ts_zulu(boundaries[idx + 1])]
+        for idx in range(len(boundaries) - 1)
+    ]
+
+
 def utc_to_settlement_period(timestamp):
     """
     Converts UTC datetime to NG settlement window
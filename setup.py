@@ -8,4 +8,12 @@ setup(
         "requests==2.31.*",
         "wheel",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+    },
+    entry_points={
+        "console_scripts": [
+            "oesdk-export=oesdk.export:main",
+        ],
+    },
 )
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+import oesdk.export
+from oesdk.export import ExportApi, partition_path
+
+if oesdk.export.pa is not None:
+    import pyarrow.parquet as pq
+
+
+class FakeHistoricalApi:
+    """
+    Three readings per hour (or none on the hours in empty_hours),
+    yielded in reverse time order unless ordered is requested.
+    """
+
+    def __init__(self, empty_hours=(), fail_after=None):
+        self.empty_hours = empty_hours
+        self.fail_after = fail_after
+        self.calls = []
+
+    def iterRawReadings(self, start, end, variable, entity_code, ordered=False):
+        self.calls.append((start, end))
+        hours = list(pd.date_range(start, end, freq="h", inclusive="left"))
+        if not ordered:
+            hours.reverse()
+        for idx, hour in enumerate(hours):
+            if self.fail_after is not None and idx >= self.fail_after:
+                raise RuntimeError("connection lost")
+            if hour.hour in self.empty_hours:
+                continue
+            yield pd.DataFrame(
+                {
+                    "Time": pd.date_range(hour, periods=3, freq="20min"),
+                    "EntityCode": entity_code,
+                    variable: [1.0, 2.0, 3.0],
+                    "Type": "raw",
+                }
+            )
+
+
+def _export_api(historical):
+    export_api = ExportApi.__new__(ExportApi)
+    export_api.historical = historical
+    return export_api
+
+
+def _read_partition(path):
+    return pd.concat(
+        [pd.read_parquet(os.path.join(path, name)) for name in sorted(os.listdir(path))]
+    )
+
+
+class TestPartitionPath(unittest.TestCase):
+    def test_partition_path(self):
+        assert partition_path("root", "L2510", "active-power", "2021-12-01") == (
+            os.path.join(
+                "root", "entity=L2510", "variable=active-power", "date=2021-12-01"
+            )
+        )
+
+
+@unittest.skipIf(oesdk.export.pa is None, "pyarrow is not installed")
+class TestExportApi(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root_path = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _path(self, date_str):
+        return partition_path(self.root_path, "L1", "active-power", date_str)
+
+    def _export(self, historical, start, end, **kwargs):
+        return _export_api(historical).exportRawReadings(
+            start, end, ["active-power"], ["L1"], self.root_path, **kwargs
+        )
+
+    def test_multi_day_partitions(self):
+        historical = FakeHistoricalApi()
+        written = self._export(historical, "2021-12-01 22:00", "2021-12-02 02:00")
+        assert written == [self._path("2021-12-01"), self._path("2021-12-02")]
+        # each partition is fetched for its whole UTC day
+        assert historical.calls == [
+            ("2021-12-01T00:00:00Z", "2021-12-02T00:00:00Z"),
+            ("2021-12-02T00:00:00Z", "2021-12-03T00:00:00Z"),
+        ]
+        for date_str in ["2021-12-01", "2021-12-02"]:
+            df = _read_partition(self._path(date_str))
+            assert len(df) == 72
+            assert list(df.columns) == ["Time", "Value", "Type"]
+
+    def test_rerun_with_narrower_range_keeps_the_whole_day(self):
+        self._export(FakeHistoricalApi(), "2021-12-01", "2021-12-02")
+        self._export(FakeHistoricalApi(), "2021-12-01 10:00", "2021-12-01 11:00")
+        assert len(_read_partition(self._path("2021-12-01"))) == 72
+        assert sorted(os.listdir(os.path.dirname(self._path("2021-12-01")))) == [
+            "date=2021-12-01"
+        ]
+
+    def test_row_groups_in_time_order(self):
+        self._export(FakeHistoricalApi(), "2021-12-01", "2021-12-02")
+        path = self._path("2021-12-01")
+        parquet_file = pq.ParquetFile(os.path.join(path, os.listdir(path)[0]))
+        assert parquet_file.metadata.num_row_groups == 24
+        stats = [
+            parquet_file.metadata.row_group(idx).column(0).statistics
+            for idx in range(parquet_file.metadata.num_row_groups)
+        ]
+        for prev, curr in zip(stats, stats[1:]):
+            assert prev.max < curr.min
+
+    def test_max_rows_per_file_rollover(self):
+        self._export(
+            FakeHistoricalApi(), "2021-12-01", "2021-12-02", max_rows_per_file=10
+        )
+        path = self._path("2021-12-01")
+        names = sorted(os.listdir(path))
+        # 3 slices (9 rows) fit in each file
+        assert len(names) == 8
+        assert names[0] == "part-00000.parquet"
+        assert all(
+            pq.ParquetFile(os.path.join(path, n)).metadata.num_rows <= 10 for n in names
+        )
+        assert len(_read_partition(path)) == 72
+
+    def test_no_data_removes_the_partition(self):
+        self._export(FakeHistoricalApi(), "2021-12-01", "2021-12-02")
+        written = self._export(
+            FakeHistoricalApi(empty_hours=range(24)), "2021-12-01", "2021-12-02"
+        )
+        assert written == []
+        assert os.listdir(os.path.dirname(self._path("2021-12-01"))) == []
+
+    def test_error_keeps_the_previous_partition(self):
+        self._export(FakeHistoricalApi(), "2021-12-01", "2021-12-02")
+        with self.assertRaises(RuntimeError):
+            self._export(FakeHistoricalApi(fail_after=5), "2021-12-01", "2021-12-02")
+        assert sorted(os.listdir(os.path.dirname(self._path("2021-12-01")))) == [
+            "date=2021-12-01"
+        ]
+        assert len(_read_partition(self._path("2021-12-01"))) == 72
+
+    def test_interrupted_swap_is_recovered(self):
+        self._export(FakeHistoricalApi(), "2021-12-01", "2021-12-02")
+        path = self._path("2021-12-01")
+        parent_path, partition_name = os.path.split(path)
+        # crash after moving the previous partition aside
+        os.replace(path, os.path.join(parent_path, "_old-" + partition_name))
+        with self.assertRaises(RuntimeError):
+            self._export(FakeHistoricalApi(fail_after=0), "2021-12-01", "2021-12-02")
+        assert os.listdir(parent_path) == [partition_name]
+        assert len(_read_partition(path)) == 72
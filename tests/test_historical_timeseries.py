@@ -0,0 +1,124 @@
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+import oesdk.historical_timeseries
+import oesdk.scheduler
+from oesdk.historical_timeseries import HistoricalApi
+
+
+class FakeResponse:
+    def __init__(self, items, status_code=200):
+        self.items = items
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return {"items": self.items}
+
+
+class FakeReadingsApi:
+    """
+    Answers resampled readings requests with a 30-minute point for every
+    window start between start and finish (both included), truncated to limit.
+    """
+
+    def __init__(self):
+        self.ranges = []
+
+    def request(self, method, url, **kwargs):
+        query = parse_qs(urlparse(url).query)
+        start, finish = query["start"][0], query["finish"][0]
+        self.ranges.append((start, finish))
+        times = pd.date_range(
+            pd.Timestamp(start).ceil("30min"), pd.Timestamp(finish), freq="30min"
+        )
+        items = [
+            {
+                "time": t.isoformat().replace("+00:00", "Z"),
+                "key": query["entity"][0],
+                "value": 1.0,
+            }
+            for t in times
+        ]
+        return FakeResponse(items[: int(query["limit"][0])])
+
+
+def _historical_api():
+    historical_api = HistoricalApi.__new__(HistoricalApi)
+    historical_api.baseUrl = "https://example.com/v1/"
+    historical_api.auth = mock.Mock(HttpHeaders={})
+    historical_api.priority = oesdk.scheduler.PRIORITY_BULK
+    return historical_api
+
+
+class TestResampledReadings(unittest.TestCase):
+    def setUp(self):
+        self.fake_api = FakeReadingsApi()
+        patcher = mock.patch.object(
+            oesdk.scheduler.requests, "request", self.fake_api.request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, start, end, resampling="30m-compliance"):
+        return _historical_api().getResampledReadings(
+            start, end, "active-power", "L1", resampling=resampling
+        )
+
+    def _check_complete(self, df, start, end):
+        expected = pd.date_range(
+            pd.Timestamp(start, tz="UTC").ceil("30min"),
+            pd.Timestamp(end, tz="UTC"),
+            freq="30min",
+        )
+        assert list(pd.to_datetime(df["Time"])) == list(expected)
+        assert (df["Type"] == "30m-compliance").all()
+
+    @mock.patch.object(
+        oesdk.historical_timeseries, "RESAMPLED_READINGS_PER_REQUEST", 48
+    )
+    def test_multiple_slices_joined_without_duplicates(self):
+        df = self._get("2019-12-01 15:10", "2019-12-05 00:00")
+        assert len(self.fake_api.ranges) == 4
+        self._check_complete(df, "2019-12-01 15:10", "2019-12-05 00:00")
+
+    @mock.patch.object(oesdk.historical_timeseries, "READINGS_LIMIT", 50)
+    def test_truncated_response_is_split_on_the_window(self):
+        df = self._get("2019-12-01 00:00", "2019-12-02 06:00")
+        # 61 points: the first response is truncated, then split in two
+        assert self.fake_api.ranges == [
+            ("2019-12-01T00:00:00Z", "2019-12-02T06:00:00Z"),
+            ("2019-12-01T00:00:00Z", "2019-12-01T15:00:00Z"),
+            ("2019-12-01T15:00:00Z", "2019-12-02T06:00:00Z"),
+        ]
+        self._check_complete(df, "2019-12-01 00:00", "2019-12-02 06:00")
+
+    def test_unknown_resampling_is_a_single_request(self):
+        df = self._get("2019-12-01 00:00", "2019-12-01 02:00", resampling="custom")
+        assert self.fake_api.ranges == [
+            ("2019-12-01T00:00:00Z", "2019-12-01T02:00:00Z")
+        ]
+        assert len(df) == 5
+
+    @mock.patch.object(oesdk.historical_timeseries, "READINGS_LIMIT", 50)
+    def test_truncated_halves_are_requested_concurrently(self):
+        # both halves must be in flight before either of them is answered
+        barrier = threading.Barrier(2, timeout=2)
+        fake_request = self.fake_api.request
+
+        def request(method, url, **kwargs):
+            if len(self.fake_api.ranges) > 0:
+                barrier.wait()
+            return fake_request(method, url, **kwargs)
+
+        with mock.patch.object(oesdk.scheduler.requests, "request", request):
+            df = self._get("2019-12-01 00:00", "2019-12-02 06:00")
+        assert len(self.fake_api.ranges) == 3
+        self._check_complete(df, "2019-12-01 00:00", "2019-12-02 06:00")
+
+    @mock.patch.object(oesdk.historical_timeseries, "READINGS_LIMIT", 2)
+    def test_truncated_window_raises(self):
+        with self.assertRaises(ValueError):
+            self._get("2019-12-01 15:00", "2019-12-01 15:30")
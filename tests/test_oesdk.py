@@ -1,10 +1,12 @@
 import unittest
 import os
 import datetime
+import tempfile
 from oesdk.demand_profiles import DemandApi
 from oesdk.entity import EntityApi
+from oesdk.export import ExportApi
 from oesdk.historical_timeseries import HistoricalApi
-from pandas import Timestamp
+from pandas import Timestamp, read_parquet
 
 
 class TestOesdk(unittest.TestCase):
@@ -54,3 +56,31 @@ class TestOesdk(unittest.TestCase):
             resampling="30m-compliance"
         )
         assert len(resampled_readings_df) == 3
+
+    def test_export_api(self):
+        export_api = ExportApi(self.username, self.password)
+        power_variable = "active-power"
+
+        with tempfile.TemporaryDirectory() as root_path:
+            # exporting twice must overwrite the partition, not append to it
+            for _ in range(2):
+                written = export_api.exportRawReadings(
+                    "2021-12-01 10:00:00",
+                    "2021-12-01 10:01:00",
+                    variables=[power_variable],
+                    entity_codes=[self.entity_code],
+                    root_path=root_path,
+                )
+            assert len(written) == 1
+            exported_df = read_parquet(root_path)
+
+        # the export is widened to the whole UTC day of the range
+        assert exported_df["Time"].min() >= Timestamp("2021-12-01", tz="UTC")
+        assert exported_df["Time"].max() < Timestamp("2021-12-02", tz="UTC")
+        raw_readings_df = export_api.historical.getRawReadings(
+            "2021-12-01",
+            "2021-12-02",
+            variable=power_variable,
+            entity_code=self.entity_code,
+        )
+        assert len(exported_df) == len(raw_readings_df)
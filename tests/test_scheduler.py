@@ -0,0 +1,423 @@
+import collections
+import threading
+import time
+import unittest
+from unittest import mock
+import requests
+import oesdk.scheduler
+from oesdk.scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REALTIME,
+    RequestScheduler,
+)
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeApi:
+    """
+    Stands in for requests.request: records the requests in flight
+    (overall and by URL prefix) and optionally blocks them until released.
+    """
+
+    def __init__(self, delay=0, blocking=False):
+        self.delay = delay
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.running_by_prefix = collections.Counter()
+        self.max_running_by_prefix = collections.Counter()
+        self.done = []
+        self.kwargs = []
+        # url -> list of responses to return before a 200
+        self.responses = {}
+
+    def request(self, method, url, **kwargs):
+        prefix = url.split("/")[0]
+        with self.lock:
+            self.kwargs.append(kwargs)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.running_by_prefix[prefix] += 1
+            self.max_running_by_prefix[prefix] = max(
+                self.max_running_by_prefix[prefix], self.running_by_prefix[prefix]
+            )
+        try:
+            self.release.wait()
+            time.sleep(self.delay)
+            with self.lock:
+                self.done.append(url)
+                if self.responses.get(url):
+                    return self.responses[url].pop(0)
+            return FakeResponse(url)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.running_by_prefix[prefix] -= 1
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met within {} seconds".format(timeout))
+        time.sleep(0.001)
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def _patch(self, fake_api):
+        patcher = mock.patch.object(
+            oesdk.scheduler.requests, "request", fake_api.request
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return fake_api
+
+    def _scheduler(self, **kwargs):
+        scheduler = RequestScheduler(**kwargs)
+        self.addCleanup(scheduler.shutdown)
+        return scheduler
+
+
+class TestRequestScheduler(SchedulerTestCase):
+    def test_invalid_realtime_reserved(self):
+        with self.assertRaises(ValueError):
+            RequestScheduler(max_concurrency=2, realtime_reserved=2)
+
+    def test_invalid_interactive_reserved(self):
+        with self.assertRaises(ValueError):
+            RequestScheduler(
+                max_concurrency=4, realtime_reserved=2, interactive_reserved=2
+            )
+
+    def test_interactive_requests_during_bulk_saturation(self):
+        """
+        A backfill on both historical routes (whose limits add up to
+        the whole non-realtime capacity) must leave slots for the
+        auth/entity/demand requests, whose timeout includes queueing.
+        """
+        release = threading.Event()
+        running = collections.Counter()
+        lock = threading.Lock()
+
+        def request(method, url, **kwargs):
+            prefix = url.split("/")[0]
+            with lock:
+                running[prefix] += 1
+            try:
+                if prefix.startswith("historical"):
+                    release.wait()
+                return FakeResponse(url)
+            finally:
+                with lock:
+                    running[prefix] -= 1
+
+        self._patch(mock.Mock(request=request))
+        scheduler = self._scheduler()
+        self.addCleanup(release.set)
+        bulk = [
+            scheduler.submit("GET", route + "/x", route, PRIORITY_BULK)
+            for route in ["historical-raw", "historical-resampled"]
+            for _ in range(50)
+        ]
+        bulk_capacity = (
+            scheduler.max_concurrency
+            - scheduler.realtime_reserved
+            - scheduler.interactive_reserved
+        )
+        _wait_until(
+            lambda: running["historical-raw"] + running["historical-resampled"]
+            == bulk_capacity
+        )
+        for route in ["auth", "entities", "demand-profiles"]:
+            start = time.monotonic()
+            response = scheduler.request(
+                "GET", route + "/x", route, PRIORITY_INTERACTIVE, timeout=1
+            )
+            assert response.status_code == 200
+            assert time.monotonic() - start < 0.5
+        # the backfill itself never grows beyond its share
+        assert running["historical-raw"] + running["historical-resampled"] == (
+            bulk_capacity
+        )
+        release.set()
+        for future in bulk:
+            assert future.result().status_code == 200
+
+    def test_global_limit(self):
+        fake_api = self._patch(FakeApi(delay=0.01))
+        scheduler = self._scheduler(
+            max_concurrency=4,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        futures = [
+            scheduler.submit("GET", "r{}/x".format(idx % 3), "r{}".format(idx % 3))
+            for idx in range(40)
+        ]
+        for future in futures:
+            assert future.result().status_code == 200
+        assert fake_api.max_running == 4
+
+    def test_route_limit(self):
+        fake_api = self._patch(FakeApi(delay=0.01))
+        scheduler = self._scheduler(
+            max_concurrency=8,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={"slow": 2},
+        )
+        futures = [scheduler.submit("GET", "slow/x", "slow") for _ in range(20)]
+        futures += [scheduler.submit("GET", "fast/x", "fast") for _ in range(20)]
+        for future in futures:
+            future.result()
+        assert fake_api.max_running_by_prefix["slow"] == 2
+        assert fake_api.max_running_by_prefix["fast"] > 2
+
+    def test_realtime_reserved_slots(self):
+        fake_api = self._patch(FakeApi(blocking=True))
+        scheduler = self._scheduler(
+            max_concurrency=4,
+            realtime_reserved=1,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        bulk = [
+            scheduler.submit("GET", "bulk/x", "bulk", PRIORITY_BULK) for _ in range(10)
+        ]
+        _wait_until(lambda: fake_api.running == 3)
+        time.sleep(0.05)
+        # the reserved slot is never used by bulk requests...
+        assert fake_api.running == 3
+        realtime = scheduler.submit("POST", "signals/x", "signals", PRIORITY_REALTIME)
+        # ...so a realtime request is sent straight away
+        _wait_until(lambda: fake_api.running == 4)
+        fake_api.release.set()
+        assert realtime.result().status_code == 200
+        for future in bulk:
+            future.result()
+
+    def test_priority_order(self):
+        fake_api = self._patch(FakeApi(blocking=True))
+        scheduler = self._scheduler(
+            max_concurrency=1,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        first = scheduler.submit("GET", "first", "r", PRIORITY_BULK)
+        _wait_until(lambda: fake_api.running == 1)
+        futures = [
+            scheduler.submit("GET", "bulk", "r", PRIORITY_BULK),
+            scheduler.submit("GET", "interactive", "r", PRIORITY_INTERACTIVE),
+            scheduler.submit("GET", "realtime", "r", PRIORITY_REALTIME),
+        ]
+        fake_api.release.set()
+        for future in [first] + futures:
+            future.result()
+        assert fake_api.done == ["first", "realtime", "interactive", "bulk"]
+
+    def test_round_robin_between_callers(self):
+        fake_api = self._patch(FakeApi(blocking=True))
+        scheduler = self._scheduler(
+            max_concurrency=1,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        first = scheduler.submit("GET", "first", "r", PRIORITY_BULK, caller="A")
+        _wait_until(lambda: fake_api.running == 1)
+        futures = [
+            scheduler.submit("GET", "a{}".format(idx), "r", PRIORITY_BULK, caller="A")
+            for idx in range(4)
+        ]
+        futures += [
+            scheduler.submit("GET", "b{}".format(idx), "r", PRIORITY_BULK, caller="B")
+            for idx in range(2)
+        ]
+        fake_api.release.set()
+        for future in [first] + futures:
+            future.result()
+        assert fake_api.done == ["first", "a0", "b0", "a1", "b1", "a2", "a3"]
+
+    def test_rate_limit_retry_after(self):
+        fake_api = self._patch(FakeApi())
+        fake_api.responses["r/x"] = [
+            FakeResponse("r/x", 429, {"Retry-After": "0.2"}),
+        ]
+        scheduler = self._scheduler()
+        start = time.monotonic()
+        response = scheduler.request("GET", "r/x", "r")
+        assert response.status_code == 200
+        assert time.monotonic() - start >= 0.2
+        assert fake_api.done == ["r/x", "r/x"]
+
+    def test_rate_limit_pauses_the_route(self):
+        fake_api = self._patch(FakeApi())
+        fake_api.responses["r/limited"] = [
+            FakeResponse("r/limited", 429, {"Retry-After": "0.3"}),
+        ]
+        scheduler = self._scheduler()
+        scheduler.request("GET", "r/first", "r")
+        limited = scheduler.submit("GET", "r/limited", "r")
+        _wait_until(lambda: "r/limited" in fake_api.done)
+        paused = scheduler.submit("GET", "r/paused", "r")
+        other = scheduler.submit("GET", "other/x", "other")
+        assert other.result().status_code == 200
+        assert not paused.done()
+        assert limited.result().status_code == 200
+        assert paused.result().status_code == 200
+
+    def test_rate_limit_max_retries(self):
+        fake_api = self._patch(FakeApi())
+        fake_api.responses["r/x"] = [
+            FakeResponse("r/x", 429, {"Retry-After": "0"}) for _ in range(5)
+        ]
+        scheduler = self._scheduler(max_retries=2)
+        response = scheduler.request("GET", "r/x", "r")
+        assert response.status_code == 429
+        assert len(fake_api.done) == 3
+
+    def test_rate_limit_no_retries(self):
+        fake_api = self._patch(FakeApi())
+        fake_api.responses["r/x"] = [FakeResponse("r/x", 429, {"Retry-After": "0"})]
+        scheduler = self._scheduler()
+        response = scheduler.request("GET", "r/x", "r", max_retries=0)
+        assert response.status_code == 429
+        assert len(fake_api.done) == 1
+
+    def test_rate_limit_retry_stops_at_timeout(self):
+        fake_api = self._patch(FakeApi())
+        fake_api.responses["r/x"] = [
+            FakeResponse("r/x", 429, {"Retry-After": "30"}),
+        ]
+        scheduler = self._scheduler()
+        start = time.monotonic()
+        response = scheduler.request("GET", "r/x", "r", timeout=1)
+        # the backoff would outlive the timeout: no retry
+        assert response.status_code == 429
+        assert time.monotonic() - start < 1
+
+    def test_timeout_covers_queueing(self):
+        fake_api = self._patch(FakeApi(blocking=True))
+        self.addCleanup(fake_api.release.set)
+        scheduler = self._scheduler(
+            max_concurrency=1,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        scheduler.submit("GET", "r/busy", "r")
+        _wait_until(lambda: fake_api.running == 1)
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            scheduler.request("GET", "r/queued", "r", timeout=0.2)
+        assert time.monotonic() - start < 1
+        fake_api.release.set()
+        _wait_until(lambda: fake_api.running == 0)
+        # the timed out request is never sent
+        time.sleep(0.05)
+        assert "r/queued" not in fake_api.done
+
+    def test_timeout_caps_the_http_timeout(self):
+        fake_api = self._patch(FakeApi())
+        scheduler = self._scheduler()
+        scheduler.request("GET", "r/x", "r", timeout=5)
+        assert 0 < fake_api.kwargs[0]["timeout"] <= 5
+
+    def test_exceptions_are_propagated(self):
+        def failing_request(method, url, **kwargs):
+            raise requests.exceptions.ConnectionError("unreachable")
+
+        self._patch(mock.Mock(request=failing_request))
+        scheduler = self._scheduler()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            scheduler.request("GET", "r/x", "r")
+
+    def test_shutdown_drains_the_queue(self):
+        fake_api = self._patch(FakeApi(delay=0.005))
+        scheduler = RequestScheduler(
+            max_concurrency=2,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        futures = [scheduler.submit("GET", "r/x", "r") for _ in range(20)]
+        scheduler.shutdown(wait=True)
+        assert all(future.done() for future in futures)
+        assert len(fake_api.done) == 20
+        with self.assertRaises(RuntimeError):
+            scheduler.submit("GET", "r/x", "r")
+
+    def test_deep_queues(self):
+        """
+        Regression: dispatching must not slow down with the number of queued
+        requests, and realtime requests must stay fast during a backfill.
+        """
+        self._patch(FakeApi(delay=0.02))
+        scheduler = self._scheduler()
+        bulk = [
+            scheduler.submit(
+                "GET", "bulk/x", "historical-raw", PRIORITY_BULK, caller=caller
+            )
+            for caller in range(20)
+            for _ in range(5000)
+        ]
+        self.addCleanup(lambda: [future.cancel() for future in bulk])
+        time.sleep(0.2)
+        latencies = []
+        for _ in range(5):
+            start = time.monotonic()
+            scheduler.request("POST", "signals/x", "signals", PRIORITY_REALTIME)
+            latencies.append(time.monotonic() - start)
+        done_before = sum(future.done() for future in bulk)
+        time.sleep(1)
+        done_after = sum(future.done() for future in bulk)
+        # 6 concurrent historical-raw requests of 20ms: ideally 300 per second
+        assert done_after - done_before > 200
+        assert max(latencies) < 0.1
+
+
+class TestSharedScheduler(SchedulerTestCase):
+    def setUp(self):
+        # the next get_scheduler() creates a new default scheduler
+        self.addCleanup(oesdk.scheduler.set_scheduler, None)
+
+    def test_get_scheduler_is_shared(self):
+        assert oesdk.scheduler.get_scheduler() is oesdk.scheduler.get_scheduler()
+
+    def test_set_scheduler(self):
+        fake_api = self._patch(FakeApi(delay=0.005))
+        previous = RequestScheduler(
+            max_concurrency=1,
+            realtime_reserved=0,
+            interactive_reserved=0,
+            route_limits={},
+        )
+        oesdk.scheduler.set_scheduler(previous)
+        queued = [oesdk.scheduler.submit("GET", "r/old", "r") for _ in range(5)]
+
+        scheduler = RequestScheduler(
+            max_concurrency=3, realtime_reserved=0, interactive_reserved=0
+        )
+        oesdk.scheduler.set_scheduler(scheduler)
+        assert oesdk.scheduler.get_scheduler() is scheduler
+        response = oesdk.scheduler.request("GET", "r/new", "r")
+        assert response.status_code == 200
+
+        # the previous scheduler completes its queued requests, then stops
+        for future in queued:
+            assert future.result().status_code == 200
+        with self.assertRaises(RuntimeError):
+            previous.submit("GET", "r/x", "r")
+        assert fake_api.done.count("r/old") == 5
@@ -0,0 +1,62 @@
+import unittest
+import pandas as pd
+from oesdk.time_helper import (
+    get_date_slices,
+    get_resampled_slices,
+    resampling_to_timedelta,
+)
+
+
+class TestTimeHelper(unittest.TestCase):
+    def test_get_date_slices_whole_days(self):
+        assert get_date_slices("2021-12-01 10:00", "2021-12-03 05:00") == [
+            ("2021-12-01", "2021-12-01T00:00:00Z", "2021-12-02T00:00:00Z"),
+            ("2021-12-02", "2021-12-02T00:00:00Z", "2021-12-03T00:00:00Z"),
+            ("2021-12-03", "2021-12-03T00:00:00Z", "2021-12-04T00:00:00Z"),
+        ]
+
+    def test_get_date_slices_end_on_midnight(self):
+        assert get_date_slices("2021-12-01", "2021-12-02") == [
+            ("2021-12-01", "2021-12-01T00:00:00Z", "2021-12-02T00:00:00Z"),
+        ]
+
+    def test_get_date_slices_within_a_day(self):
+        assert get_date_slices("2021-12-01 10:00", "2021-12-01 11:00") == [
+            ("2021-12-01", "2021-12-01T00:00:00Z", "2021-12-02T00:00:00Z"),
+        ]
+
+    def test_get_date_slices_empty_range(self):
+        assert get_date_slices("2021-12-01 10:00", "2021-12-01 10:00") == []
+
+    def test_resampling_to_timedelta(self):
+        assert resampling_to_timedelta("30m") == pd.Timedelta(minutes=30)
+        assert resampling_to_timedelta("30m-compliance") == pd.Timedelta(minutes=30)
+        assert resampling_to_timedelta("1h") == pd.Timedelta(hours=1)
+        assert resampling_to_timedelta("1d") == pd.Timedelta(days=1)
+        assert resampling_to_timedelta("unknown") is None
+
+    def test_get_resampled_slices_unaligned_start(self):
+        window = pd.Timedelta(minutes=30)
+        assert get_resampled_slices(
+            "2019-12-01 15:10", "2019-12-01 22:01", window, 4
+        ) == [
+            ["2019-12-01T15:10:00Z", "2019-12-01T17:00:00Z"],
+            ["2019-12-01T17:00:00Z", "2019-12-01T19:00:00Z"],
+            ["2019-12-01T19:00:00Z", "2019-12-01T21:00:00Z"],
+            ["2019-12-01T21:00:00Z", "2019-12-01T22:01:00Z"],
+        ]
+
+    def test_get_resampled_slices_end_on_boundary(self):
+        window = pd.Timedelta(minutes=30)
+        assert get_resampled_slices(
+            "2019-12-01 15:00", "2019-12-01 19:00", window, 4
+        ) == [
+            ["2019-12-01T15:00:00Z", "2019-12-01T17:00:00Z"],
+            ["2019-12-01T17:00:00Z", "2019-12-01T19:00:00Z"],
+        ]
+
+    def test_get_resampled_slices_single_slice(self):
+        window = pd.Timedelta(minutes=30)
+        assert get_resampled_slices(
+            "2019-12-01 15:00", "2019-12-01 16:01", window, 20000
+        ) == [["2019-12-01T15:00:00Z", "2019-12-01T16:01:00Z"]]